@@ -1,17 +1,58 @@
+from collections import deque
 from logging import Handler
+from threading import Timer
 
 from dearpygui import dearpygui as dpg
 
 class CustomUILogHandler(Handler):
 
-    def __init__(self, parent_id, **kwargs) -> None:
+    def __init__(
+        self, parent_id, maxlen=2000, interval=0.1, **kwargs
+    ) -> None:
         super().__init__(**kwargs)
         self.parent_id = parent_id
+        self.interval = interval
+        # scrollback shown in a single text item, refreshed at most
+        # once per interval instead of adding one item per record
+        self.buf = deque(maxlen=maxlen)
+        self.pending = []
+        self.text_id = None
+        self.timer = None
 
     def emit(self, msg):
-        msg=self.format(msg)
-        dpg.add_text(msg, parent=self.parent_id)
+        # called with the handler lock held
+        self.pending.append(self.format(msg))
+        if self.timer is None:
+            self.timer = Timer(self.interval, self._render)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _render(self):
+        self.acquire()
+        try:
+            self.timer = None
+            children = dpg.get_item_children(self.parent_id, 1)
+            if not children or children[-1] != self.text_id:
+                # log area was cleared or other messages were added after
+                # the last records, continue in a new item to keep order
+                self.buf.clear()
+                self.text_id = dpg.add_text(parent=self.parent_id)
+            self.buf.extend(self.pending)
+            self.pending.clear()
+            dpg.set_value(self.text_id, "\n".join(self.buf))
+        finally:
+            self.release()
         dpg.set_y_scroll("log_window", -1.0)
 
     def flush(self):
-        dpg.delete_item(self.parent_id, children_only=True)
\ No newline at end of file
+        self.acquire()
+        try:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.buf.clear()
+            self.pending.clear()
+            self.text_id = None
+        finally:
+            self.release()
+        dpg.delete_item(self.parent_id, children_only=True)
@@ -1,10 +1,12 @@
 from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import gzip
 import os
 import sys
 import subprocess
 import logging
 from pathlib import Path
-from glob import glob
 
 from packaging import version
 from dearpygui import dearpygui as dpg
@@ -18,8 +20,20 @@ from PipelineStepError import PipelineStepError
 from CustomUILogHandler import CustomUILogHandler
 import model
 
+# fastq probes by folder, only valid for a single pipeline invocation
+_FASTQ_CACHE = {}
+# conda setup of the session, reset after (re)installing the environments
+_CONDA_SETUP_CACHE = None
+# gui values read in one go when setting up the pipeline
+_PIPELINE_KEYS = (
+    "threads", "keep_intermediate", "genome_size", "coverage",
+    "filtlong_minlen", "medaka_manumodel", "racon_skip",
+    *(f"use_{asm}" for asm in model.ASSEMBLERS)
+)
+
 
 def execute_pipeline():
+    _FASTQ_CACHE.clear()
     dir = Path(dpg.get_value("bcfolder"))
     if not _preflight_check(dir):
         return
@@ -108,82 +122,59 @@ def _preflight_check(dir):
     return False
 
 
-def _use_folder(folder):
-    if not folder.is_dir() or not _has_fastq(folder):
-        return False
+def _use_folder(folder, skip_unclassified):
+    name = folder.name
     # safeguard against rerun from unclean environment
     # we do not want to recurse deeper in original folder
-    if (
-        folder.stem.startswith("original")
-        or folder.stem.startswith("assemblies")
-    ):
+    if name.startswith(("original", "assemblies")):
         return False
-    if dpg.get_value("skip_unclassified"):
-        return not folder.stem.startswith("unclassified")
-    return True
+    if skip_unclassified and name.startswith("unclassified"):
+        return False
+    return folder.is_dir() and _has_fastq(folder)
 
 
 def _has_fastq(folder):
-    for entry in folder.iterdir():
-        if (entry.is_file() and ".fastq" in entry.suffixes):
-            return True
+    key = os.fspath(folder)
+    has_fastq = _FASTQ_CACHE.get(key)
+    if has_fastq is not None:
+        return has_fastq
+    # scandir hands out the names directly and any() stops on the first hit
+    with os.scandir(folder) as entries:
+        has_fastq = any(
+            entry.is_file() and _is_fastq(entry.name) for entry in entries
+        )
+    _FASTQ_CACHE[key] = has_fastq
+    return has_fastq
+
+
+def _is_fastq(name):
+    return name.endswith((".fastq", ".fastq.gz"))
 
 
 def _calculate_coverage(dir):
-    # calculates coverage in the given directory via
-    # awk '{if ((NR%=4)==2) print;}' *.fastq | wc | awk '{print $NF-$(NF-1);}'
-    if sys.version_info < (3, 10):
-        cwd = os.getcwd()
-        os.chdir(dir)
-        gzip_proc = subprocess.Popen(
-            ["gunzip", "-fck"] + glob("*.fastq.gz"),
-            cwd=dir, stdout=subprocess.PIPE
-        )
-        if not glob("*.fastq.gz"):
-            awk_proc_1 = subprocess.Popen(
-                ["awk", "{if ((NR%=4)==2) print;}"] + glob("*.fastq"),
-                cwd=dir, stdout=subprocess.PIPE
-            )
-        else:
-            awk_proc_1 = subprocess.Popen(
-                ["awk", "{if ((NR%=4)==2) print;}", "-"] + glob("*.fastq"),
-                cwd=dir, stdin=gzip_proc.stdout, stdout=subprocess.PIPE
-            )
-    else:
-        gzip_proc = subprocess.Popen(
-            ["gunzip", "-fck"] + glob("*.fastq.gz", root_dir=dir),
-            cwd=dir, stdout=subprocess.PIPE
-        )
-        if not glob("*.fastq.gz"):
-            awk_proc_1 = subprocess.Popen(
-                ["awk", "{if ((NR%=4)==2) print;}"]
-                + glob("*.fastq", root_dir=dir),
-                cwd=dir, stdout=subprocess.PIPE
-            )
-        else:
-            awk_proc_1 = subprocess.Popen(
-                ["awk", "{if ((NR%=4)==2) print;}", "-"]
-                + glob("*.fastq", root_dir=dir),
-                cwd=dir, stdin=gzip_proc.stdout, stdout=subprocess.PIPE
-            )
-    wc_proc = subprocess.Popen(
-        ["wc"], stdin=awk_proc_1.stdout, stdout=subprocess.PIPE
-    )
-    awk_proc_2 = subprocess.run(
-        ["awk", "{print $NF-$(NF-1);}"], stdin=wc_proc.stdout,
-        capture_output=True
-    )
-    bases = int(awk_proc_2.stdout.decode())
+    with os.scandir(dir) as entries:
+        fastqs = [
+            entry.path for entry in entries
+            if entry.is_file() and _is_fastq(entry.name)
+        ]
+    bases = sum(_count_bases(fastq) for fastq in fastqs)
     genome_size = dpg.get_value("genome_size") * 1_000_000
-    if sys.version_info < (3, 10):
-        os.chdir(cwd)
     return bases / genome_size
 
 
+def _count_bases(fastq):
+    # sum the lengths of the sequence lines, ie. every fourth line
+    # starting with the second one
+    opener = gzip.open if os.fspath(fastq).endswith(".gz") else open
+    with opener(fastq, "rb") as fh:
+        return sum(len(line.rstrip()) for line in islice(fh, 1, None, 4))
+
+
 def check_coverages(dir):
     if not dir.is_dir():
         ErrorWindow(f"The given path {dir} is not a directory.")
         return None
+    _FASTQ_CACHE.clear()
     msg = []
     results = {}
     for folder in _fastq_folder_iter(dir):
@@ -207,24 +198,27 @@ def check_coverages(dir):
 
 
 def _fastq_folder_iter(dir):
+    skip_unclassified = dpg.get_value("skip_unclassified")
     yield from (
-        entry for entry in dir.iterdir() if _use_folder(entry)
+        entry for entry in dir.iterdir()
+        if _use_folder(entry, skip_unclassified)
     )
     if _has_fastq(dir):
         yield dir
 
 
 def _setup_pipeline():
-    threads = dpg.get_value("threads")
-    keep_intermediate = dpg.get_value("keep_intermediate")
-    genome_size = dpg.get_value("genome_size")
-    coverage = dpg.get_value("coverage")
-    min_len = dpg.get_value("filtlong_minlen")
+    vals = dict(zip(_PIPELINE_KEYS, dpg.get_values(_PIPELINE_KEYS)))
+    threads = vals["threads"]
+    keep_intermediate = vals["keep_intermediate"]
+    genome_size = vals["genome_size"]
+    coverage = vals["coverage"]
+    min_len = vals["filtlong_minlen"]
     bases = int(genome_size * 1_000) * 1_000 * coverage
-    medaka_mod = dpg.get_value("medaka_manumodel")
-    is_racon = not dpg.get_value("racon_skip")
+    medaka_mod = vals["medaka_manumodel"]
+    is_racon = not vals["racon_skip"]
 
-    asms = [i for i in model.get_assemblers() if dpg.get_value(f"use_{i}")]
+    asms = [asm for asm in model.ASSEMBLERS if vals[f"use_{asm}"]]
     logging.info("Setting up pipeline with the following parameters:")
     logging.info(f"  Threads: {threads}, Filtlong min-len: {min_len}")
     logging.info(f"  Genome Size: {genome_size}, Coverage: {coverage}")
@@ -237,18 +231,17 @@ def _setup_pipeline():
     if not keep_intermediate:
         steps.append(CleanDuplexStep())
 
-    for assembler in model.get_assemblers():
-        if dpg.get_value(f"use_{assembler}"):
-            steps.append(AssemblyStep(threads, assembler))
+    for assembler in asms:
+        steps.append(AssemblyStep(threads, assembler))
 
-            if assembler == "Flye" and is_racon:
-                steps.append(RaconPolishingStep(threads))
+        if assembler == "Flye" and is_racon:
+            steps.append(RaconPolishingStep(threads))
 
-            steps.append(
-                MedakaPolishingStep(threads, assembler, medaka_mod, is_racon)
-            )
-            if not keep_intermediate:
-                steps.append(CleanAssemblyStep(assembler, is_racon))
+        steps.append(
+            MedakaPolishingStep(threads, assembler, medaka_mod, is_racon)
+        )
+        if not keep_intermediate:
+            steps.append(CleanAssemblyStep(assembler, is_racon))
     if not keep_intermediate:
         steps.append(CleanFilterStep())
         steps.append(FinalCleanStep())
@@ -275,6 +268,9 @@ def get_conda_version():
             ["which", "conda"], capture_output=True, env=env
         ).stdout.decode()
         model.PREFIXES['conda'] = Path(conda_bin).parent
+        model.CONDA_ENV = {
+            'PATH': f"{model.get_prefix('conda')}:{os.environ['PATH']}"
+        }
         return conda_version
     except FileNotFoundError:
         return None
@@ -290,24 +286,27 @@ def set_conda_envs(envs, prefs):
         **{'conda': model.get_prefix('conda')}
     }
     model.PREFIXES = prefixes
+    model.VERSIONS = {pkg: ver for pkg, (_, ver) in prefs.items()}
 
 
 def init_conda_envs():
-    conda_path = model.get_prefix("conda")
-    assert conda_path != ""
+    global _CONDA_SETUP_CACHE
+    assert model.CONDA_ENV
     print("doing conda init")
 
+    existing = {name for name, _ in _get_conda_envs()}
     for name, yml in model.get_conda_ymls():
         dpg.set_value("log_text", f"Checking for an environment named {name}")
-        if name not in [i[0] for i in _get_conda_envs()]:
+        if name not in existing:
             print(f"Creating environment {name}")
             proc = subprocess.run(
                 ["conda", "create", "-n", name, "--yes"], capture_output=True,
-                env={'PATH': f"{os.environ['PATH']}:{conda_path}"}
+                env=model.CONDA_ENV
             )
             if proc.returncode != 0:
                 raise OSError(proc.returncode, proc.stderr.decode())
             print(proc.stdout.decode())
+            existing.add(name)
         dpg.set_value("log_text", f"Running install for {name}")
         proc = subprocess.run(
             [
@@ -315,33 +314,46 @@ def init_conda_envs():
                 "--channel", "bioconda", "--channel", "conda-forge",
                 "--channel", "default", "--yes"
             ], capture_output=True,
-            env={'PATH': f"{os.environ['PATH']}:{conda_path}"}
+            env=model.CONDA_ENV
         )
         if proc.returncode != 0:
             raise OSError(proc.returncode, proc.stderr.decode())
         print(proc.stdout.decode())
+    # the environments changed, so the cached setup is stale
+    _CONDA_SETUP_CACHE = None
     set_conda_envs(*get_conda_setup())
 
 
 def check_pkgs(envs):
-    missing = []
-    available = [pkg for pkgs in envs.values() for pkg in pkgs]
-    for pkg_name in model.BINARIES:
-        if pkg_name not in available:
-            missing.append(pkg_name)
+    available = {pkg for pkgs in envs.values() for pkg in pkgs}
+    missing = [pkg for pkg in model.BINARIES if pkg not in available]
     status = "complete" if not missing else "incomplete"
     return status, missing
 
 
 def get_conda_setup():
+    global _CONDA_SETUP_CACHE
+    if _CONDA_SETUP_CACHE is None:
+        _CONDA_SETUP_CACHE = _collect_conda_setup()
+    return _CONDA_SETUP_CACHE
+
+
+def _collect_conda_setup():
     prefs = {}
     envs = {}
-    for env_name, pref in _get_conda_envs():
-        if env_name == "":
-            continue
+    conda_envs = [
+        (env_name, pref) for env_name, pref in _get_conda_envs()
+        if env_name != ""
+    ]
+    # conda list is slow to start up, so query all environments at once
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        env_pkgs = list(ex.map(
+            _get_conda_packages, [env_name for env_name, _ in conda_envs]
+        ))
+    for (env_name, pref), pkgs in zip(conda_envs, env_pkgs):
         pkgs_in_env = []
-        for pkg_name, ver in _get_conda_packages(env_name):
-            if pkg_name in model.BINARIES:
+        for pkg_name, ver in pkgs:
+            if pkg_name in model.BINARY_SET:
                 pkgs_in_env.append(pkg_name)
                 if (
                     not (
@@ -357,38 +369,41 @@ def get_conda_setup():
 
 
 def _get_conda_envs():
-    conda_path = model.get_prefix("conda")
-    assert conda_path != ""
+    assert model.CONDA_ENV
 
     proc = subprocess.run(
         ["conda", "info", "--envs"], capture_output=True,
-        env={'PATH': f"{conda_path}:{os.environ['PATH']}"}
+        env=model.CONDA_ENV
     )
     if proc.returncode != 0:
         raise OSError(proc.returncode, proc.stderr.decode())
-    return [
-        (
-            env.split()[0] if len(env.split()) > 1 else "",
-            env.split()[-1]
+    envs = []
+    for env in proc.stdout.splitlines()[2:-1]:
+        parts = env.split()
+        if not parts:
+            continue
+        envs.append(
+            (parts[0].decode() if len(parts) > 1 else "", parts[-1].decode())
         )
-        for env in proc.stdout.decode().splitlines()[2:-1]
-    ]
+    return envs
 
 
 def _get_conda_packages(env):
-    conda_path = model.get_prefix("conda")
-    assert conda_path != ""
+    assert model.CONDA_ENV
 
     proc = subprocess.run(
         ["conda", "list", "-n", env], capture_output=True,
-        env={'PATH': f"{os.environ['PATH']}:{conda_path}"}
+        env=model.CONDA_ENV
     )
     if proc.returncode != 0:
         raise OSError(proc.returncode, proc.stderr)
-    return [
-        (i.split()[0], i.split()[1])
-        for i in proc.stdout.decode().splitlines()[3:]
-    ]
+    # split the raw bytes and only decode the name and version columns
+    pkgs = []
+    for line in proc.stdout.splitlines()[3:]:
+        parts = line.split(None, 2)
+        if len(parts) >= 2:
+            pkgs.append((parts[0].decode(), parts[1].decode()))
+    return pkgs
 
 ################## model selection
 
@@ -420,36 +435,21 @@ def _get_closest_guppy_ver(guppy_version, versions):
 
 def get_closest_model(cell, device, guppy, variant):
     all_models = model.get_model_df()
+    matches = all_models["cell"].eq(cell) & all_models["variant"].eq(variant)
 
-    # check for cell, device and variant
-    query = f"cell == '{cell}' & device == '{device}' & variant == '{variant}'"
-    filtered = all_models.query(query)
-    if len(filtered.guppy) == 1:
-        return filtered.full_model.iloc[0]
-    if not filtered.empty:
-        guppy_ver = _get_closest_guppy_ver(guppy, filtered.guppy)
-        query += f" & guppy == '{guppy_ver}'"
-        return all_models.query(query).full_model.iloc[0]
-
-    # check for cell, variant and empty device
+    # check for cell, device and variant, then for cell, variant and
+    # empty device and finally for cell and variant only
+    masks = [matches & all_models["device"].eq(device)]
     if not device == "":
-        query = f"cell == '{cell}' & variant == '{variant}' & device == ''"
-        filtered = all_models.query(query)
+        masks.append(matches & all_models["device"].eq(""))
+    masks.append(matches)
+
+    for mask in masks:
+        filtered = all_models[mask]
         if len(filtered.guppy) == 1:
             return filtered.full_model.iloc[0]
         if not filtered.empty:
             guppy_ver = _get_closest_guppy_ver(guppy, filtered.guppy)
-            query += f" & guppy == '{guppy_ver}'"
-            return all_models.query(query).full_model.iloc[0]
-
-    # check for cell and variant
-    query = f"cell == '{cell}' & variant == '{variant}'"
-    filtered = all_models.query(query)
-    if len(filtered.guppy) == 1:
-        return filtered.full_model.iloc[0]
-    if not filtered.empty:
-        guppy_ver = _get_closest_guppy_ver(guppy, filtered.guppy)
-        query += f" & guppy == '{guppy_ver}'"
-        return all_models.query(query).full_model.iloc[0]
+            return filtered[filtered.guppy.eq(guppy_ver)].full_model.iloc[0]
 
     return None
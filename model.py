@@ -1,5 +1,9 @@
+import json
 import os
+import re
 import subprocess
+import tempfile
+import threading
 from pathlib import Path
 
 import pandas as pd
@@ -15,8 +19,16 @@ BINARIES = [
     "racon",
     "medaka"
 ]
+# for membership tests on conda package listings
+BINARY_SET = frozenset(BINARIES)
+
+ASSEMBLERS = ("Flye", "Raven", "Miniasm")
 
 PREFIXES = {}
+# package versions of the chosen conda setup
+VERSIONS = {}
+# environment for all conda calls, set once conda has been located
+CONDA_ENV = {}
 
 ############################ Medaka model detection
 # medaka_env = {"PATH": model.get_prefix('medaka')+f":{os.environ['PATH']}"}
@@ -43,6 +55,20 @@ PREFIXES = {}
 ########################################################
 
 MODELS = None
+_MODELS_LOCK = threading.Lock()
+
+# medaka model names look like <cell>[_<device>]_<variant>[_<guppy>][_rle]
+_MODEL_RE = re.compile(
+    r"^(?P<cell>[^_]+)_(?:(?P<device>min|prom)_)?(?P<variant>.+?)"
+    r"(?:_(?P<guppy>g\d+))?(?:_rle)?$"
+)
+_PARSED_MODELS = {}
+_MODEL_NAME_RE = re.compile(r"([\w.]+)")
+# available models only change with the medaka version, so they are
+# kept on disk between sessions
+MODEL_CACHE = Path(
+    os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+) / "nanoamp" / "medaka_models.json"
 
 # medaka 1.6.1
 # set(cell) = {'r103', 'r10', 'r104', 'r1041', 'r941'}
@@ -215,11 +241,24 @@ def get_medaka_standard_model():
 def get_model_df():
     global MODELS
     if MODELS is None:
-        MODELS = _parse_models()
+        # waits for a running background lookup instead of
+        # starting medaka twice
+        with _MODELS_LOCK:
+            if MODELS is None:
+                MODELS = _parse_models()
     return MODELS
 
 
 def _parse_models():
+    medaka_ver = VERSIONS.get("medaka")
+    models = _read_model_cache(medaka_ver)
+    if models is None:
+        models = _list_medaka_models()
+        _write_model_cache(medaka_ver, models)
+    return _build_model_df(models)
+
+
+def _list_medaka_models():
     medaka_env = {"PATH": get_prefix('medaka') + f":{os.environ['PATH']}"}
     proc = subprocess.run(
         ["medaka", "tools", "list_models"], capture_output=True, env=medaka_env
@@ -229,19 +268,69 @@ def _parse_models():
         raise OSError(proc.returncode, proc.stderr.decode())
     models = proc.stdout.decode().splitlines()[0]
 
-    # split allmodels, remove first entry "Available:"
-    # and strip trailing "," all but last
-    models = [mod[:-1] for mod in models.split()[1:-1]] + [models.split()[-1]]
-    cell = [mod.split("_")[0] for mod in models]
-    device = [mod.split("_")[1] if mod.split("_")[1] in ["min", "prom"]
-              else "" for mod in models]
-    guppy = [mod.split("_")[-1] if mod.split("_")[-1].startswith("g")
-             else mod.split("_")[-2] for mod in models]
-    variant = ["_".join(
-               mod.split("_")[1:-1] if mod.split("_")[1] not in ["min", "prom"]
-               else mod.split("_")[2:-1] if mod.split("_")[-1].startswith("g")
-               else mod.split("_")[2:-2]
-               ) for mod in models]
+    # drop the first entry "Available:" and the separating commas
+    return _MODEL_NAME_RE.findall(models)[1:]
+
+
+def _read_model_cache(medaka_ver):
+    if medaka_ver is None:
+        return None
+    try:
+        with open(MODEL_CACHE) as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != medaka_ver:
+        return None
+    models = cache.get("models")
+    if (
+        not isinstance(models, list)
+        or not all(isinstance(mod, str) for mod in models)
+    ):
+        return None
+    return models
+
+
+def _write_model_cache(medaka_ver, models):
+    if medaka_ver is None:
+        return
+    try:
+        MODEL_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that other instances
+        # never read a partially written cache
+        fd, tmp = tempfile.mkstemp(dir=MODEL_CACHE.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(
+                    {"version": medaka_ver, "models": models},
+                    fh, separators=(",", ":")
+                )
+            os.replace(tmp, MODEL_CACHE)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        # the cache is only an optimization
+        pass
+
+
+def parse_model(name):
+    parsed = _PARSED_MODELS.get(name)
+    if parsed is None:
+        match = _MODEL_RE.match(name)
+        if match is None:
+            raise ValueError(f"The model name {name} can not be parsed.")
+        parsed = match.groupdict(default="")
+        _PARSED_MODELS[name] = parsed
+    return parsed
+
+
+def _build_model_df(models):
+    parsed = [parse_model(mod) for mod in models]
+    cell = [mod["cell"] for mod in parsed]
+    device = [mod["device"] for mod in parsed]
+    guppy = [mod["guppy"] for mod in parsed]
+    variant = [mod["variant"] for mod in parsed]
     df = pd.DataFrame({
         "full_model": models,
         "cell": cell,
@@ -249,21 +338,19 @@ def _parse_models():
         "variant": variant,
         "guppy": guppy
     })
-
-    def filter_crit(variant):
-        if "snp" in variant:
-            return False
-        if "variant" in variant:
-            return False
-        if "plant" in variant:
-            return False
-        return True
-
-    return df[lambda df: [filter_crit(var) for var in df["variant"]]]
+    # drop snp, variant calling and plant models
+    df = df[~df["variant"].str.contains("snp|variant|plant")]
+    # categorical columns turn the selection masks into integer compares
+    return df.astype({
+        "cell": "category",
+        "device": "category",
+        "variant": "category",
+        "guppy": "category"
+    })
 
 
 def get_assemblers():
-    return ["Flye", "Raven", "Miniasm"]
+    return list(ASSEMBLERS)
 
 
 def get_intermediate_folders(base):
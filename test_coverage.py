@@ -0,0 +1,25 @@
+import gzip
+
+import pytest
+
+from controller import _count_bases
+
+READS = b"".join([
+    b"@read1\nACGTACGT\n+\n!!!!!!!!\n",
+    b"@read2\nACG\n+\n!!!\n",
+    b"@read3\nACGTA\n+\n!!!!!",
+])
+
+
+@pytest.mark.parametrize("name", ["reads.fastq", "reads.fastq.gz"])
+def test_count_bases(tmp_path, name):
+    fastq = tmp_path / name
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(fastq, "wb") as fh:
+        fh.write(READS)
+    assert 16 == _count_bases(fastq)
+
+
+def test_count_bases_empty(tmp_path):
+    (tmp_path / "empty.fastq").touch()
+    assert 0 == _count_bases(tmp_path / "empty.fastq")
@@ -0,0 +1,75 @@
+import pytest
+
+import controller
+from controller import _has_fastq, _is_fastq, _use_folder
+
+
+@pytest.fixture
+def clear_fastq_cache():
+    controller._FASTQ_CACHE.clear()
+    yield
+    controller._FASTQ_CACHE.clear()
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("reads.fastq", True),
+        ("reads.fastq.gz", True),
+        ("reads.fastq.bak", False),
+        ("reads.fasta", False),
+        ("fastq", False)
+    ]
+)
+def test_is_fastq(name, expected):
+    assert expected == _is_fastq(name)
+
+
+@pytest.mark.parametrize(
+    "entries, expected",
+    [
+        ([], False),
+        (["notes.txt"], False),
+        (["notes.txt", "example.fastq"], True),
+        (["example.fastq.gz"], True)
+    ]
+)
+def test_has_fastq(tmp_path, clear_fastq_cache, entries, expected):
+    (tmp_path / "folder.fastq").mkdir()
+    for entry in entries:
+        (tmp_path / entry).touch()
+    assert expected == _has_fastq(tmp_path)
+
+
+def test_has_fastq_cached(tmp_path, clear_fastq_cache):
+    assert not _has_fastq(tmp_path)
+    (tmp_path / "example.fastq").touch()
+    assert not _has_fastq(tmp_path)
+    controller._FASTQ_CACHE.clear()
+    assert _has_fastq(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "name, skip_unclassified, expected",
+    [
+        ("barcode01", True, True),
+        ("original", False, False),
+        ("assemblies_barcode01", False, False),
+        ("unclassified", True, False),
+        ("unclassified", False, True)
+    ]
+)
+def test_use_folder(
+    tmp_path, clear_fastq_cache, name, skip_unclassified, expected
+):
+    folder = tmp_path / name
+    folder.mkdir()
+    (folder / "example.fastq").touch()
+    assert expected == _use_folder(folder, skip_unclassified)
+
+
+def test_use_folder_without_fastq(tmp_path, clear_fastq_cache):
+    (tmp_path / "barcode01").mkdir()
+    (tmp_path / "example.fastq").touch()
+    assert not _use_folder(tmp_path / "barcode01", True)
+    assert not _use_folder(tmp_path / "example.fastq", True)
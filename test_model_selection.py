@@ -1,6 +1,8 @@
 import pytest
 
+import model
 from controller import _get_closest_guppy_ver, get_closest_model
+from model import _build_model_df, parse_model
 
 
 @pytest.mark.parametrize(
@@ -77,3 +79,128 @@ def test_get_closest_guppy_version(guppy_version, versions, expected):
 def test_get_closest_model(params, expected):
     cell, device, guppy, variant = params
     assert expected == get_closest_model(cell, device, guppy, variant)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("r941_min_hac_g507", ("r941", "min", "hac", "g507")),
+        ("r103_prom_high_g360", ("r103", "prom", "high", "g360")),
+        ("r104_e81_sup_g5015", ("r104", "", "e81_sup", "g5015")),
+        (
+            "r1041_e82_400bps_fast_g615",
+            ("r1041", "", "e82_400bps_fast", "g615")
+        ),
+        ("r941_min_high_g351_rle", ("r941", "min", "high", "g351"))
+    ]
+)
+def test_build_model_df(name, expected):
+    row = _build_model_df([name]).iloc[0]
+    assert name == row.full_model
+    assert expected == (row.cell, row.device, row.variant, row.guppy)
+
+
+def test_build_model_df_filters_variants():
+    models = [
+        "r941_min_hac_g507",
+        "r941_min_hac_variant_g507",
+        "r941_prom_snp_g303",
+        "r941_sup_plant_g610"
+    ]
+    assert ["r941_min_hac_g507"] == list(_build_model_df(models).full_model)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        (
+            "r104_e81_sup_g5015_rle",
+            {"cell": "r104", "device": "", "variant": "e81_sup",
+             "guppy": "g5015"}
+        ),
+        (
+            "r941_prom_sup_plant_g610",
+            {"cell": "r941", "device": "prom", "variant": "sup_plant",
+             "guppy": "g610"}
+        ),
+        (
+            "r941_min_high",
+            {"cell": "r941", "device": "min", "variant": "high", "guppy": ""}
+        )
+    ]
+)
+def test_parse_model(name, expected):
+    assert expected == parse_model(name)
+
+
+def test_parse_model_invalid():
+    with pytest.raises(ValueError):
+        parse_model("r941")
+
+
+@pytest.fixture
+def mock_models(monkeypatch):
+    models = [
+        "r941_min_hac_g507",
+        "r941_prom_hac_g4011",
+        "r941_prom_hac_g507",
+        "r103_min_high_g345",
+        "r103_min_high_g360",
+        "r103_prom_high_g360",
+        "r104_e81_sup_g5015"
+    ]
+    monkeypatch.setattr(model, "MODELS", _build_model_df(models))
+
+
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        # exact match
+        (("r941", "min", "g507", "hac"), "r941_min_hac_g507"),
+        # closest smaller guppy version
+        (("r941", "prom", "g514", "hac"), "r941_prom_hac_g507"),
+        # no smaller guppy version available
+        (("r103", "min", "g303", "high"), "r103_min_high_g345"),
+        # fallback on models without device
+        (("r104", "min", "g610", "e81_sup"), "r104_e81_sup_g5015"),
+        # fallback on any device
+        (("r103", "", "g360", "high"), "r103_min_high_g360"),
+        # no variant found
+        (("r941", "min", "g507", "sup"), None),
+    ]
+)
+def test_get_closest_model_from_table(mock_models, params, expected):
+    cell, device, guppy, variant = params
+    assert expected == get_closest_model(cell, device, guppy, variant)
+
+
+@pytest.fixture
+def model_cache(tmp_path, monkeypatch):
+    cache = tmp_path / "nanoamp" / "medaka_models.json"
+    monkeypatch.setattr(model, "MODEL_CACHE", cache)
+    yield cache
+
+
+def test_model_cache(model_cache):
+    models = ["r941_min_hac_g507", "r103_min_high_g360"]
+    assert model._read_model_cache("1.6.1") is None
+    model._write_model_cache("1.6.1", models)
+    assert models == model._read_model_cache("1.6.1")
+    assert model._read_model_cache("1.7.0") is None
+    assert model._read_model_cache(None) is None
+    model_cache.write_text("{")
+    assert model._read_model_cache("1.6.1") is None
+    model_cache.write_text('{"version":"1.6.1","models":"r941"}')
+    assert model._read_model_cache("1.6.1") is None
+    model_cache.write_text('{"version":"1.6.1","models":[1,2]}')
+    assert model._read_model_cache("1.6.1") is None
+    assert [model_cache] == list(model_cache.parent.iterdir())
+
+
+def test_parse_models_from_cache(model_cache, monkeypatch):
+    def _fail():
+        raise AssertionError("medaka should not be called")
+    monkeypatch.setattr(model, "VERSIONS", {"medaka": "1.6.1"})
+    monkeypatch.setattr(model, "_list_medaka_models", _fail)
+    model._write_model_cache("1.6.1", ["r941_min_hac_g507"])
+    assert ["r941_min_hac_g507"] == list(model._parse_models().full_model)
@@ -1,5 +1,6 @@
 import webbrowser
 from pathlib import Path
+import threading
 import time
 
 import dearpygui.dearpygui as dpg
@@ -72,7 +73,7 @@ def check_env_setup(force=False):
     dpg.configure_item("main_group", show=True)
     if status == "complete" and not force:
         controller.set_conda_envs(envs, prefs)
-        dpg.configure_item("medaka_manumodel", items=model.get_models())
+        _fill_model_choices()
         return
     with dpg.window(
         modal=True, label="Checking Conda Setup", autosize=True,
@@ -94,6 +95,22 @@ def check_env_setup(force=False):
             dpg.add_loading_indicator()
 
 
+def _fill_model_choices():
+    # listing the medaka models is slow, so fill the model choices
+    # in the background instead of blocking the gui
+    def _fill():
+        try:
+            models = model.get_models()
+        except OSError as e:
+            msg = "The available medaka models could not be listed.\n"
+            msg += f"{e}"
+            ErrorWindow(msg)
+            return
+        dpg.configure_item("medaka_manumodel", items=models)
+
+    threading.Thread(target=_fill, daemon=True).start()
+
+
 def _miniconda_link():
     webbrowser.open("https://docs.conda.io/en/latest/miniconda.html", new=2)
     dpg.stop_dearpygui()
@@ -118,7 +135,7 @@ def _handle_conda_init(sender):
     dpg.configure_item("progress_ind", show=True)
     controller.init_conda_envs()
     dpg.configure_item("conda_check", show=False)
-    dpg.configure_item("medaka_manumodel", items=model.get_models())
+    _fill_model_choices()
     with dpg.tab(
         label="Conda Setup", tag="conda_tab", parent="tab_bar",
     ):
@@ -318,7 +335,8 @@ def _toggle_medaka_model(sender) -> None:
 
 def _select_medaka_model(sender):
     mod = dpg.get_value(sender)
-    model_row = model.get_model_df().query(f"full_model == '{mod}'")
+    all_models = model.get_model_df()
+    model_row = all_models[all_models["full_model"].eq(mod)]
     for name in "device", "cell", "guppy", "variant":
         choice = model.get_display_names(name, model_row[name])[0]
         dpg.set_value("medaka_" + name, choice)
@@ -326,9 +344,10 @@ def _select_medaka_model(sender):
 
 def _change_model_param(sender):
     kwargs = {}
-    for name in ["device", "cell", "guppy", "variant"]:
-        dpg_name = "medaka_" + name
-        if (val := dpg.get_value(dpg_name)) == "--":
+    names = ["device", "cell", "guppy", "variant"]
+    vals = dpg.get_values(["medaka_" + name for name in names])
+    for name, val in zip(names, vals):
+        if val == "--":
             dpg.set_value("medaka_manumodel", "--")
             return
         else: